@@ -1,31 +1,59 @@
+#!/usr/bin/env python3
+"""
+create_word_clouds.py
+
+Render word cloud images from one or more frequency CSVs (as written by
+word_clouds.py / phrases_counts.py).
+
+Usage:
+  python3 create_word_clouds.py word_clouds.csv phrases_ngram2.csv --show
+"""
+
+import argparse
+from pathlib import Path
+
 import pandas as pd
 from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-
-# Load CSV
-csv_path = "word_clouds.csv"   # change this
-df = pd.read_csv(csv_path)
-#df = df.iloc[:10, :]
-
-# Convert two columns into a dictionary: {"data": 347, "information": 74, ...}
-freq_dict = dict(zip(df["phrase"], df["count"]))
-
-# Create word cloud
-wc = WordCloud(
-    width=1200,
-    height=600,
-    background_color="white"
-)
-
-wordcloud_img = wc.generate_from_frequencies(freq_dict)
-
-# Display word cloud
-plt.figure(figsize=(12, 6))
-plt.imshow(wordcloud_img, interpolation="bilinear")
-plt.axis("off")
-plt.tight_layout()
-plt.show()
-
-# Save
-wordcloud_img.to_file("wordcloud.png")
-print("Saved to wordcloud.png")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Create word cloud images from frequency CSVs.")
+    ap.add_argument("csvs", nargs="*", default=["word_clouds.csv"],
+                    help="Frequency CSV files (default: word_clouds.csv)")
+    ap.add_argument("--show", action="store_true",
+                    help="Also display each cloud in a matplotlib window")
+    args = ap.parse_args()
+
+    # One WordCloud instance for all CSVs: the canvas and font machinery
+    # are set up once and reused by each generate_from_frequencies call.
+    wc = WordCloud(
+        width=1200,
+        height=600,
+        background_color="white"
+    )
+
+    for csv_path in args.csvs:
+        df = pd.read_csv(csv_path)
+
+        # First column holds the word/phrase, second the count; going through
+        # the index uses pandas' vectorized path instead of zipping columns.
+        freq_dict = df.set_index(df.columns[0])[df.columns[1]].to_dict()
+
+        wordcloud_img = wc.generate_from_frequencies(freq_dict)
+
+        out_path = Path(csv_path).with_suffix(".png")
+        wordcloud_img.to_file(out_path)
+        print(f"Saved to {out_path}")
+
+        # Only pay for matplotlib when a display is actually wanted
+        if args.show:
+            import matplotlib.pyplot as plt
+            plt.figure(figsize=(12, 6))
+            plt.imshow(wordcloud_img, interpolation="bilinear")
+            plt.axis("off")
+            plt.tight_layout()
+            plt.show()
+
+
+if __name__ == "__main__":
+    main()
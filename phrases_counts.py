@@ -11,30 +11,171 @@ Usage:
 
 import argparse
 import csv
-import re
+import heapq
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from collections import Counter
 from pathlib import Path
 import sys
-from typing import Optional, Set, Dict, List
-from itertools import islice
+from typing import Optional, FrozenSet, Dict, List
+from itertools import chain, islice
+from operator import itemgetter
 
-# --- Timestamp patterns ---
-RANGE_VTT = re.compile(r"\b\d{2}:\d{2}:\d{2}[.,]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[.,]\d{3}\b")
-STAMP_HMS_MS = re.compile(r"\b\d{2}:\d{2}:\d{2}[.,]\d{3}\b")
-STAMP_HMS = re.compile(r"\b\d{2}:\d{2}:\d{2}\b")
-STAMP_MS = re.compile(r"(?<!\d)\b\d{1,2}:\d{2}\b(?!:\d)")
-STAMP_BRACKETED = re.compile(r"\[\s*\d{1,2}:\d{2}(?::\d{2})?\s*\]")
+import re
 
-LINE_NUMBER_SRT = re.compile(r"^\s*\d+\s*$")
-WEBVTT_HEADER = re.compile(r"^\s*WEBVTT\b", re.IGNORECASE)
-VTT_CUE_TAG = re.compile(r"</?c(?:\.[^>]+)?>", re.IGNORECASE)
+# google-re2 executes patterns as a linear-time DFA, but it has no fallback
+# for constructs it cannot compile (e.g. the lookarounds in STAMP_MS), so
+# try it per pattern and keep the stdlib engine for the ones it rejects.
+try:
+    import re2 as _re2
+except ImportError:
+    _re2 = None
+
+def _compile(pattern, ignorecase: bool = False):
+    text = pattern if isinstance(pattern, str) else pattern.decode("ascii")
+    # Skip re2 outright for lookaround patterns it can never take, so the
+    # doomed compile attempt does not spam error logs on stderr.
+    if _re2 is not None and "(?<" not in text and "(?!" not in text and "(?=" not in text:
+        try:
+            opts = _re2.Options()
+            opts.case_sensitive = not ignorecase
+            return _re2.compile(pattern, opts)
+        except Exception:
+            pass
+    return re.compile(pattern, re.IGNORECASE if ignorecase else 0)
 
-SPEAKER_PREFIX = re.compile(r"^\s*[^:]{1,80}:\s+")
-HTML_TAG = re.compile(r"<[^>]+>")
-URL = re.compile(r"https?://\S+|www\.\S+", re.IGNORECASE)
+# pandas is only used to serialize full CSV dumps in vectorized C.
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
 
-NON_ALNUM_APOST = re.compile(r"[^a-zA-Z0-9'\-]+")
-APOST_EDGES = re.compile(r"(^'+|'+$)")
+# --- Timestamp patterns ---
+RANGE_VTT = _compile(r"\b\d{2}:\d{2}:\d{2}[.,]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[.,]\d{3}\b")
+STAMP_HMS_MS = _compile(r"\b\d{2}:\d{2}:\d{2}[.,]\d{3}\b")
+STAMP_HMS = _compile(r"\b\d{2}:\d{2}:\d{2}\b")
+STAMP_MS = _compile(r"(?<!\d)\b\d{1,2}:\d{2}\b(?!:\d)")
+STAMP_BRACKETED = _compile(r"\[\s*\d{1,2}:\d{2}(?::\d{2})?\s*\]")
+
+VTT_CUE_TAG = _compile(r"</?c(?:\.[^>]+)?>", ignorecase=True)
+
+HTML_TAG = _compile(r"<[^>]+>")
+URL = _compile(r"https?://\S+|www\.\S+", ignorecase=True)
+
+# One fused alternation so a single sub() pass strips every removable span;
+# the anchored speaker-prefix check lives in clean_line as string ops.
+STRIP_RE = _compile("(?:" + "|".join(p.pattern for p in (
+    RANGE_VTT, STAMP_HMS_MS, STAMP_HMS, STAMP_MS, STAMP_BRACKETED,
+    URL, HTML_TAG, VTT_CUE_TAG,
+)) + ")", ignorecase=True)
+
+# Translation table mapping every Latin-1 char outside [a-zA-Z0-9-] to a
+# space; a single C-level translate() pass replaces the old regex sub.
+_TRANS = str.maketrans({
+    c: " " for c in map(chr, range(256))
+    if not ("a" <= c <= "z" or "A" <= c <= "Z" or "0" <= c <= "9" or c == "-")
+})
+# Apostrophes (straight and curly) are deleted outright so don't -> dont.
+_TRANS[ord("'")] = None
+_TRANS[ord("\u2019")] = None
+
+# With apostrophes gone, tokens are alnum runs optionally joined by hyphens;
+# one findall() extracts them all in C instead of a per-token Python loop.
+TOKEN_RE = _compile(r"[a-zA-Z0-9]+(?:-[a-zA-Z0-9]+)*")
+
+def _line_safe_bytes(pattern: str) -> bytes:
+    """Bytes version of a pattern with matches confined to one line: [^>]
+    and \s include newlines, so over a whole buffer a stray "<" could pair
+    with a ">" lines later and swallow the text in between."""
+    return (pattern.encode("ascii")
+            .replace(b"[^>]", b"[^>\\r\\n]")
+            .replace(b"\\s", b"[^\\S\\r\\n]"))
+
+# Bytes twin of STRIP_RE: timestamps/URLs/markup are pure ASCII, so they can
+# be removed before the file is ever decoded.
+STRIP_RE_B = _compile(_line_safe_bytes(STRIP_RE.pattern), ignorecase=True)
+
+# Hyperscan, when installed, finds every removable span in one multi-pattern
+# DFA walk over the raw bytes. STAMP_MS keeps its lookarounds, which
+# hyperscan cannot compile, so it always runs on the regex engine.
+try:
+    import hyperscan
+
+    _HS_PATTERNS = [_line_safe_bytes(p.pattern) for p in (
+        RANGE_VTT, STAMP_HMS_MS, STAMP_HMS, STAMP_BRACKETED,
+        URL, HTML_TAG, VTT_CUE_TAG,
+    )]
+    _HS_DB = hyperscan.Database()
+    _HS_DB.compile(
+        expressions=_HS_PATTERNS,
+        ids=list(range(len(_HS_PATTERNS))),
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST | hyperscan.HS_FLAG_CASELESS]
+              * len(_HS_PATTERNS),
+    )
+    _STAMP_MS_B = _compile(_line_safe_bytes(STAMP_MS.pattern))
+
+    def _strip_bytes(data) -> bytes:
+        spans = []
+        _HS_DB.scan(bytes(data),
+                    match_event_handler=lambda pid, start, end, flags, ctx:
+                        spans.append((start, end)))
+        if not spans:
+            return _STAMP_MS_B.sub(b" ", bytes(data))
+        # Blank out the union of the reported spans in one rebuild.
+        spans.sort()
+        parts = []
+        pos = 0
+        for start, end in spans:
+            if end <= pos:
+                continue
+            if start > pos:
+                parts.append(data[pos:start])
+            parts.append(b" ")
+            pos = end
+        parts.append(data[pos:])
+        return _STAMP_MS_B.sub(b" ", b"".join(parts))
+except Exception:
+    def _strip_bytes(data) -> bytes:
+        return STRIP_RE_B.sub(b" ", data)
+
+# Optional Numba fast path: a JIT-compiled byte scanner that emits token
+# spans via a 256-entry lookup table, no regex engine involved. Purely
+# additive - tokenize falls back to TOKEN_RE when numba/numpy are absent.
+_APOS_DEL = {ord("'"): None, ord("\u2019"): None}
+try:
+    import numpy as np
+    from numba import njit
+
+    _TOKEN_LUT = np.zeros(256, dtype=np.bool_)
+    for _c in b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789":
+        _TOKEN_LUT[_c] = True
+
+    @njit(cache=True)
+    def _token_spans(buf, lut):
+        # Same grammar as TOKEN_RE: alnum runs joined by single hyphens.
+        spans = []
+        i = 0
+        n = buf.shape[0]
+        while i < n:
+            if not lut[buf[i]]:
+                i += 1
+                continue
+            start = i
+            i += 1
+            while True:
+                while i < n and lut[buf[i]]:
+                    i += 1
+                if i + 1 < n and buf[i] == 45 and lut[buf[i + 1]]:  # '-'
+                    i += 2
+                else:
+                    break
+            spans.append(start)
+            spans.append(i)
+        return spans
+except Exception:
+    _token_spans = None
 
 DEFAULT_STOPWORDS = {
     "a","an","and","the","or","but","if","then","than","that","this","those","these","there","here","when","where",
@@ -47,59 +188,89 @@ DEFAULT_STOPWORDS = {
     "um","uh","erm","hmm","like","kinda","sorta","yeah","right","okay","ok","alright"
 }
 
+@lru_cache(maxsize=None)
 def guess_fmt(p: Path) -> str:
     ext = p.suffix.lower()
     if ext == ".vtt": return "vtt"
     if ext == ".srt": return "srt"
     return "txt"
 
-def strip_timestamps_everywhere(s: str) -> str:
-    s = RANGE_VTT.sub(" ", s)
-    s = STAMP_BRACKETED.sub(" ", s)
-    s = STAMP_HMS_MS.sub(" ", s)
-    s = STAMP_HMS.sub(" ", s)
-    s = STAMP_MS.sub(" ", s)
-    return s
-
-def clean_line(line: str, fmt: str) -> str:
-    s = line.rstrip("\r\n")
-    if not s:
-        return ""
+def _make_cleaner(fmt: str):
+    """Build a line cleaner specialized for one format; the format branches
+    are resolved here, once per file, rather than on every line, and each
+    closure carries its own line cache."""
+    # Plain string tests are far cheaper than regexes fired on every line
     if fmt == "vtt":
-        if WEBVTT_HEADER.match(s):
+        def header_drop(raw: bytes) -> bool:
+            t = raw.lstrip()
+            return t[:6].upper() == b"WEBVTT" and (
+                len(t) == 6 or not (t[6:7].isalnum() or t[6:7] == b"_"))
+    elif fmt == "srt":
+        def header_drop(raw: bytes) -> bool:
+            return raw.strip().isdigit()
+    else:
+        header_drop = None
+
+    strip_sub = STRIP_RE.sub
+
+    @lru_cache(maxsize=200_000)
+    def clean(raw: bytes) -> str:
+        raw = raw.rstrip(b"\r\n")
+        if not raw:
             return ""
-        s = VTT_CUE_TAG.sub(" ", s)
-    if fmt == "srt" and LINE_NUMBER_SRT.match(s):
-        return ""
-
-    s = URL.sub(" ", s)
-    s = HTML_TAG.sub(" ", s)
-    s = strip_timestamps_everywhere(s)
-    s = SPEAKER_PREFIX.sub("", s)
-
-    if (s.startswith("(") and s.endswith(")")) or (s.startswith("[") and s.endswith("]")):
-        return ""
-    return s.strip()
-
-def tokenize(text: str, keep_numbers: bool) -> List[str]:
-    text = NON_ALNUM_APOST.sub(" ", text)
-    out = []
-    for raw in text.split():
-        tok = APOST_EDGES.sub("", raw).replace("’", "'")
-        tok = tok.replace("'", "")
-        if not keep_numbers and tok.isdigit():
-            continue
-        if tok:
-            out.append(tok)
-    return out
+        if header_drop is not None and header_drop(raw):
+            return ""
+        # Only lines that survive the bytes-level checks pay for decoding
+        s = raw.decode("utf-8", errors="ignore")
+
+        s = strip_sub(" ", s)
+        # Leading "Name: " speaker label, hand-rolled (^\s*[^:]{1,80}:\s+):
+        # the first colon must sit within 80 chars of the text start and
+        # be followed by whitespace. Three C-level string ops per line
+        # instead of the most backtrack-happy regex in the old pipeline.
+        i = 0
+        n = len(s)
+        while i < n and s[i].isspace():
+            i += 1
+        j = s.find(":", 0, i + 81)
+        if j >= 1 and j + 1 < n and s[j + 1].isspace():
+            s = s[j + 1:].lstrip()
+
+        if (s.startswith("(") and s.endswith(")")) or (s.startswith("[") and s.endswith("]")):
+            return ""
+        return s.strip()
+
+    return clean
 
-def load_stopwords(path: Optional[str]) -> Set[str]:
+_CLEANERS = {fmt: _make_cleaner(fmt) for fmt in ("vtt", "srt", "txt")}
+
+def clean_line(line: str, fmt: str) -> str:
+    return _CLEANERS[fmt](line.encode("utf-8"))
+
+@lru_cache(maxsize=200_000)
+def tokenize(text: str, keep_numbers: bool) -> tuple:
+    if _token_spans is not None:
+        # "replace" keeps non-ASCII as "?" separators, matching TOKEN_RE.
+        data = text.translate(_APOS_DEL).encode("ascii", "replace")
+        buf = np.frombuffer(data, dtype=np.uint8)
+        spans = _token_spans(buf, _TOKEN_LUT)
+        tokens = [data[spans[i]:spans[i + 1]].decode("ascii")
+                  for i in range(0, len(spans), 2)]
+    else:
+        tokens = TOKEN_RE.findall(text.translate(_TRANS))
+    if not keep_numbers:
+        tokens = [t for t in tokens if not t.isdigit()]
+    # Interned tokens make Counter hashing and stopword membership checks
+    # short-circuit on object identity; cached calls return them for free.
+    return tuple(map(sys.intern, tokens))
+
+def load_stopwords(path: Optional[str]) -> FrozenSet[str]:
     sw = set(DEFAULT_STOPWORDS)
     if path:
         p = Path(path)
         if p.is_file():
             sw |= {ln.strip().lower() for ln in p.read_text(encoding="utf-8").splitlines() if ln.strip()}
-    return sw
+    return frozenset(map(sys.intern, sw))
 
 def iter_files(root: Path):
     for p in root.rglob("*"):
@@ -108,49 +279,124 @@ def iter_files(root: Path):
 
 # --- N-GRAM GENERATOR ---
 def make_ngrams(tokens: List[str], n: int):
-    if len(tokens) < n:
-        return []
-    return [" ".join(tokens[i:i+n]) for i in range(len(tokens) - n + 1)]
+    # Sliding window via zip of n staggered iterators; nothing is
+    # materialized and zip simply yields nothing when len(tokens) < n.
+    return map(" ".join, zip(*(islice(tokens, i, None) for i in range(n))))
+
+# --- PER-FILE WORKER ---
+def _read_bytes(fp: Path) -> bytes:
+    """Read a transcript via mmap, stripping removable spans at the bytes
+    level; decoding is deferred to the per-line cleaners."""
+    try:
+        with open(fp, "rb") as f:
+            # Hint sequential access so the kernel prefetches ahead of the
+            # scan; with the worker pool this keeps many reads in flight.
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                data = _strip_bytes(mm)
+    except (OSError, ValueError, TypeError):  # empty file, or mmap unsupported
+        data = _strip_bytes(fp.read_bytes())
+    return data
+
+def _process_file(fp: Path, stop: FrozenSet[str], minlen: int, lower: bool,
+                  keep_numbers: bool, ngrams: tuple):
+    word_counts = Counter()
+    # All sizes share one counter; a key with n-1 spaces is an n-gram, so
+    # the sizes never collide and each line needs just one update call.
+    all_ngrams = Counter()
+
+    cleaner = _CLEANERS[guess_fmt(fp)]
+    data = _read_bytes(fp)
+
+    # Stream line by line instead of materializing one giant cleaned
+    # string (plus a second lowercased copy) per file. A short tail of
+    # the last max_n-1 kept tokens carries across lines so N-grams
+    # still form over line breaks exactly as before.
+    max_n = max(ngrams, default=0)
+    tail: List[str] = []
+    # Hoist per-iteration attribute lookups out of the hot loop
+    wc_upd = word_counts.update
+    ng_upd = all_ngrams.update
+    from_iter = chain.from_iterable
+    for ln in data.splitlines():
+        s = cleaner(ln)
+        if not s:
+            continue
+        if lower:
+            s = s.lower()
+        kept = (t for t in tokenize(s, keep_numbers)
+                if len(t) >= minlen and t not in stop)
+        if not ngrams:
+            # No N-grams wanted: stream the filtered tokens straight into
+            # the counter without materializing a list per line.
+            wc_upd(kept)
+            continue
+        tokens = list(kept)
+        if not tokens:
+            continue
+
+        wc_upd(tokens)
+
+        # Count N-grams; grams fully inside the tail were counted on an
+        # earlier line, so prepend only the n-1 tokens of context.
+        ng_upd(from_iter(
+            make_ngrams(tokens if n == 1 else tail[-(n - 1):] + tokens, n)
+            for n in ngrams))
+        if max_n > 1:
+            tail = (tail + tokens)[-(max_n - 1):]
+
+    return word_counts, all_ngrams
 
 # --- MAIN PARSER ---
 def parse_dir(root: Path, args):
     word_counts = Counter()
-    ngram_counts = {n: Counter() for n in args.ngrams}
+    all_ngrams = Counter()
 
     stop = load_stopwords(args.stopwords)
-
-    for fp in iter_files(root):
+    files = list(iter_files(root))
+    worker = partial(_process_file, stop=stop, minlen=args.minlen,
+                     lower=args.lower, keep_numbers=args.keep_numbers,
+                     ngrams=tuple(args.ngrams))
+
+    # Files are independent and regex-bound, so fan them out across cores;
+    # a single file is not worth the pool start-up cost.
+    if len(files) > 1:
+        executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+        results = executor.map(worker, files, chunksize=8)
+    else:
+        executor = None
+        results = map(worker, files)
+
+    for fp, (wc, ngc) in zip(files, results):
         if args.verbose:
-            print(f"Processing: {fp}", file=sys.stderr)
+            print(f"Processed: {fp}", file=sys.stderr)
+        word_counts.update(wc)
+        all_ngrams.update(ngc)
 
-        fmt = guess_fmt(fp)
-        try:
-            text = fp.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            text = fp.read_text(encoding="latin-1", errors="ignore")
-
-        lines = (clean_line(ln, fmt) for ln in text.splitlines())
-        cleaned = " ".join(l for l in lines if l)
-
-        if args.lower:
-            cleaned = cleaned.lower()
-
-        tokens = tokenize(cleaned, keep_numbers=args.keep_numbers)
-        tokens = [t for t in tokens if len(t) >= args.minlen and t not in stop]
-
-        word_counts.update(tokens)
-
-        # Count N-grams
-        for n in args.ngrams:
-            ngrams = make_ngrams(tokens, n)
-            ngram_counts[n].update(ngrams)
+    if executor is not None:
+        executor.shutdown()
 
+    # Split the shared counter back out per size for the CSV writers.
+    ngram_counts: Dict[int, Counter] = {n: Counter() for n in args.ngrams}
+    for gram, count in all_ngrams.items():
+        ngram_counts[gram.count(" ") + 1][gram] = count
     return word_counts, ngram_counts
 
 # --- CSV WRITER ---
 def write_csv(counts: Counter, out_path: Path, top: Optional[int]):
-    rows = counts.most_common(top) if top else counts.most_common()
     out_path.parent.mkdir(parents=True, exist_ok=True)
+    if top:
+        # O(N log top) heap selection instead of sorting the whole vocabulary
+        rows = heapq.nlargest(top, counts.items(), key=itemgetter(1))
+    elif pd is not None:
+        # Full dump: let pandas sort and serialize in vectorized C
+        (pd.DataFrame(counts.items(), columns=["phrase", "count"])
+           .sort_values("count", ascending=False, kind="stable")
+           .to_csv(out_path, index=False, lineterminator="\r\n"))
+        return
+    else:
+        rows = counts.most_common()
     with out_path.open("w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
         w.writerow(["phrase", "count"])